@@ -0,0 +1,9 @@
+"""
+Django settings for running the test suite.
+"""
+from app.settings import *  # noqa
+
+# Tests do not need a deliberately slow password hasher.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
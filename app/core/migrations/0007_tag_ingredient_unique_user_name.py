@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-15 04:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge tags and ingredients sharing a (user, name) pair."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tag'), ('Ingredient', 'ingredient')):
+        Model = apps.get_model('core', model_name)
+        Through = getattr(Recipe, f'{field}s').through
+        duplicates = (
+            Model.objects.order_by().values('user', 'name')
+            .annotate(keep=Min('id'), count=Count('id'))
+            .filter(count__gt=1)
+        )
+        for dup in duplicates:
+            others = Model.objects.filter(
+                user=dup['user'], name=dup['name'],
+            ).exclude(id=dup['keep'])
+            recipes = Through.objects.filter(
+                **{f'{field}__in': others},
+            ).values_list('recipe', flat=True).distinct()
+            Through.objects.bulk_create(
+                [
+                    Through(recipe_id=recipe, **{f'{field}_id': dup['keep']})
+                    for recipe in recipes
+                ],
+                ignore_conflicts=True,
+            )
+            others.delete()
+    # Fire the deferred FK checks so the constraints can alter the tables.
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='uniq_ingredient_user_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='uniq_tag_user_name'),
+        ),
+    ]
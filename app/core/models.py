@@ -74,6 +74,17 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+
+    class Meta:
+        # The constraint's (user_id, name) index also serves the per-user
+        # '-name' ordering of the list endpoint with a backward index scan.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='uniq_tag_user_name',
+            ),
+        ]
+
     def __str__(self):
         """Return string representation of the tag."""
         return self.name
@@ -85,6 +96,16 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+
+    class Meta:
+        # Its index serves the list ordering, as for Tag.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='uniq_ingredient_user_name',
+            ),
+        ]
+
     def __str__(self):
         """Return string representation of the ingredient."""
         return self.name
@@ -0,0 +1,42 @@
+"""
+Renderers for the API.
+"""
+from decimal import Decimal
+
+import orjson
+from django.http.multipartparser import parse_header
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def _default(obj):
+    """Convert values orjson cannot serialize natively."""
+    if isinstance(obj, (Decimal, Promise)):
+        return force_str(obj)
+    raise TypeError(f'Type {type(obj).__name__} is not JSON serializable')
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Render JSON using orjson."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes."""
+        if data is None:
+            return b''
+        # DRF's ListField and DictField validation errors use int keys.
+        option = orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        """Return whether indented output was requested."""
+        if accepted_media_type:
+            params = parse_header(accepted_media_type.encode('ascii'))[1]
+            if params.get('indent'):
+                return True
+        return bool((renderer_context or {}).get('indent'))
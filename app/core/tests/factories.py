@@ -0,0 +1,51 @@
+"""
+Helpers for creating model instances in tests.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from core.models import Ingredient, Recipe
+
+RECIPE_DEFAULTS = {
+    'title': 'Sample Recipe',
+    'time_minutes': 22,
+    'price': Decimal('5.25'),
+    'description': 'Sample recipe description',
+    'link': 'http://example.com/recipe.pdf',
+}
+
+_password_hash = None
+
+
+def fast_create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user, hashing a password only once per run.
+
+    Every user gets the first hash computed, so only use this for users
+    that are authenticated with force_authenticate.
+    """
+    global _password_hash
+    user_model = get_user_model()
+    user = user_model(email=user_model.objects.normalize_email(email))
+    if _password_hash is None:
+        user.set_password(password)
+        _password_hash = user.password
+    else:
+        user.password = _password_hash
+    user.save()
+    return user
+
+
+def bulk_create_ingredients(user, names):
+    """Create and return ingredients for a user in a single query."""
+    return Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=name) for name in names]
+    )
+
+
+def bulk_create_recipes(user, n=2, **params):
+    """Create and return sample recipes for a user in a single query."""
+    defaults = {**RECIPE_DEFAULTS, **params}
+    return Recipe.objects.bulk_create(
+        [Recipe(user=user, **defaults) for _ in range(n)]
+    )
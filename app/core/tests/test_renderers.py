@@ -0,0 +1,43 @@
+"""
+Test for renderers.
+"""
+from decimal import Decimal
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer."""
+
+    def test_render_data(self):
+        """Test rendering nested data to JSON bytes."""
+        data = {'id': 1, 'tags': [{'name': 'Vegan'}]}
+        res = ORJSONRenderer().render(data)
+        self.assertEqual(res, b'{"id":1,"tags":[{"name":"Vegan"}]}')
+
+    def test_render_non_string_keys(self):
+        """Test dicts with integer keys are rendered."""
+        data = {'tags': {0: ['This field may not be blank.']}}
+        res = ORJSONRenderer().render(data)
+        self.assertEqual(
+            res, b'{"tags":{"0":["This field may not be blank."]}}',
+        )
+
+    def test_render_indent(self):
+        """Test data is indented when the renderer context asks for it."""
+        res = ORJSONRenderer().render(
+            {'a': [1, 2]}, 'application/json', {'indent': 4},
+        )
+        self.assertEqual(res, b'{\n  "a": [\n    1,\n    2\n  ]\n}')
+
+    def test_render_decimal_and_lazy_string(self):
+        """Test decimals and lazy strings are rendered as strings."""
+        data = {'price': Decimal('5.25'), 'detail': _('Not found.')}
+        res = ORJSONRenderer().render(data)
+        self.assertEqual(res, b'{"price":"5.25","detail":"Not found."}')
+
+    def test_render_none(self):
+        """Test rendering no data returns an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
@@ -1,30 +1,61 @@
 """
 Serializers for the Recipe API Views.
 """
+import copy
+
+from django.db import transaction
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
 
-class TagSerializer(serializers.ModelSerializer):
+class CachedFieldsMixin:
+    """Build serializer fields once per class and copy them per instance."""
+    _fields_cache = {}
+
+    def get_fields(self):
+        """Return a fresh copy of the cached fields for this class."""
+        cls = self.__class__
+        if cls not in cls._fields_cache:
+            cls._fields_cache[cls] = super().get_fields()
+        # Deep copy so nested serializers are not shared between parents.
+        return copy.deepcopy(cls._fields_cache[cls])
+
+class OnlyFieldsMixin:
+    """Expose the concrete model fields a serializer reads."""
+    @classmethod
+    def get_default_fields_for_only(cls):
+        """Return Meta.fields without declared relations, for only()."""
+        return [
+            field for field in cls.Meta.fields
+            if field not in cls._declared_fields
+        ]
+
+class TagSerializer(OnlyFieldsMixin,
+                    CachedFieldsMixin,
+                    serializers.ModelSerializer):
     """Serializer for tag objects."""
     class Meta:
         model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ('id', 'name')
+        read_only_fields = ('id',)
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(OnlyFieldsMixin,
+                           CachedFieldsMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredient objects."""
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ('id', 'name')
+        read_only_fields = ('id',)
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(OnlyFieldsMixin,
+                       CachedFieldsMixin,
+                       serializers.ModelSerializer):
     """Serializer for recipe objects."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
     class Meta:
         model = Recipe
-        fields = [
+        fields = (
             'id',
             'title',
             'time_minutes',
@@ -32,44 +63,73 @@ class RecipeSerializer(serializers.ModelSerializer):
             'link',
             'tags',
             'ingredients',
+        )
+        read_only_fields = ('id',)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Prefetch nested relations to avoid a query per recipe."""
+        return queryset.prefetch_related('tags', 'ingredients')
+
+    def _get_or_create_objects(self, model, items):
+        """Return objects matching item names, creating any missing ones.
+
+        Relies on (user, name) being unique so conflicting inserts can be
+        ignored and picked up by the final lookup.
+        """
+        auth_user = self.context['request'].user
+        # Skip exact repeats; names are case-sensitive like the constraint.
+        names = list(dict.fromkeys(item['name'] for item in items))
+        if not names:
+            return []
+        existing = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [
+            model(user=auth_user, name=name)
+            for name in names if name not in existing
         ]
-        read_only_fields = ['id']
+        if missing:
+            model.objects.bulk_create(missing, ignore_conflicts=True)
+            # Primary keys are not set when ignoring conflicts, so refetch.
+            existing = {
+                obj.name: obj
+                for obj in model.objects.filter(user=auth_user, name__in=names)
+            }
+        return list(existing.values())
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_tags(self, tags):
         """Handle getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
+        return self._get_or_create_objects(Tag, tags)
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
+    def _get_or_create_ingredients(self, ingredients):
         """Handle getting or creating ingredients as needed."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(user=auth_user, **ingredient)
-            recipe.ingredients.add(ingredient_obj)
+        return self._get_or_create_objects(Ingredient, ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe with tags."""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a recipe with tags."""
-        tags = validated_data.pop('tags', [])
-        ingredients = validated_data.pop('ingredients', [])
+        # Relations missing from the payload are left as they are.
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            # Clear existing ingredients
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            # Only rows that differ from the current set are written.
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients)
+            )
         if tags is not None:
-            # Clear existing tags
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -77,16 +137,35 @@ class RecipeSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class RecipeListSerializer(OnlyFieldsMixin,
+                           CachedFieldsMixin,
+                           serializers.ModelSerializer):
+    """Serializer for listing recipes with tag and ingredient names."""
+    tags = serializers.SlugRelatedField(
+        many=True,
+        read_only=True,
+        slug_field='name',
+    )
+    ingredients = serializers.SlugRelatedField(
+        many=True,
+        read_only=True,
+        slug_field='name',
+    )
+    class Meta:
+        model = Recipe
+        fields = RecipeSerializer.Meta.fields
+        read_only_fields = ('id',)
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description']
-        # read_only_fields = RecipeSerializer.Meta.read_only_fields + ['description']
+        fields = RecipeSerializer.Meta.fields + ('description',)
+        # read_only_fields = RecipeSerializer.Meta.read_only_fields + ('description',)
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = ('id', 'image')
+        read_only_fields = ('id',)
         extra_kwargs = {'image': {'required': True}}
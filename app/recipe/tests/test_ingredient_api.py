@@ -5,28 +5,32 @@ from decimal import Decimal
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from django.test import TestCase
-from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
 from core.models import (
     Ingredient,
     Recipe
 )
-from recipe.serializers import IngredientSerializer
+from core.tests.factories import (
+    bulk_create_ingredients,
+    bulk_create_recipes,
+    fast_create_user,
+)
+
 
+PRICE_5_00 = Decimal('5.00')
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
-def create_user(email='user@example.com', password='testpass123'):
-    """Create and return a new user."""
-    return get_user_model().objects.create_user(email=email, password=password)
+INGREDIENT_DETAIL_URL = (
+    reverse('recipe:ingredient-detail', args=[0]).rsplit('/', 2)[0] + '/{}/'
+)
 
 def detail_url(ingredient_id):
     """Create and return a ingredient detail URL."""
-    return reverse('recipe:ingredient-detail', args=[ingredient_id])
+    return INGREDIENT_DETAIL_URL.format(ingredient_id)
 
-class PublicIngredientsApiTests(TestCase):
+class PublicIngredientsApiTests(SimpleTestCase):
     """Test the publicly available ingredients API."""
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
 
     def test_auth_required(self):
         """Test that authentication is required to access the API."""
@@ -35,25 +39,29 @@ class PublicIngredientsApiTests(TestCase):
 
 class PrivateIngredientsApiTests(TestCase):
     """Test the authorized user ingredients API."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = fast_create_user()
+
     def setUp(self):
-        self.client = APIClient()
-        self.user = create_user()
         self.client.force_authenticate(self.user)
 
     def test_retrieve_ingredients(self):
         """Test retrieving a list of ingredients."""
-        Ingredient.objects.create(user=self.user, name='Carrot')
-        Ingredient.objects.create(user=self.user, name='Cucumber')
+        bulk_create_ingredients(self.user, ['Carrot', 'Cucumber'])
 
         res = self.client.get(INGREDIENTS_URL)
-        ingredients = Ingredient.objects.all().order_by('-name')
-        serializer = IngredientSerializer(ingredients, many=True)
+        expected = list(
+            Ingredient.objects.order_by('-name').values('id', 'name')
+        )
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(list(res.data), expected)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients returned are for the authenticated user."""
-        other_user = create_user(email='user2@example.com', password='testpass123')
+        other_user = fast_create_user(email='user2@example.com', password='testpass123')
         Ingredient.objects.create(user=other_user, name='Potato')
         ingredient = Ingredient.objects.create(user=self.user, name='Tomato')
         res = self.client.get(INGREDIENTS_URL)
@@ -70,8 +78,7 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.patch(url, payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        ingredient.refresh_from_db()
-        self.assertEqual(ingredient.name, payload['name'])
+        self.assertEqual(res.data['name'], payload['name'])
 
     def test_delete_ingredient(self):
         """Test deleting an ingredient."""
@@ -93,6 +100,18 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(ingredient.name, payload['name'])
         self.assertEqual(ingredient.user, self.user)
 
+    def test_update_ingredient_duplicate_name(self):
+        """Test renaming an ingredient to an existing name fails."""
+        bulk_create_ingredients(self.user, ['Salt'])
+        ingredient = Ingredient.objects.create(user=self.user, name='Pepper')
+        payload = {'name': 'Salt'}
+        url = detail_url(ingredient.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'Pepper')
+
     def test_filter_ingridents_assign_to_recipes(self):
         """Test listing ingredients by those assigned to recipes."""
         ingredient1 = Ingredient.objects.create(user=self.user, name='Onion')
@@ -100,35 +119,28 @@ class PrivateIngredientsApiTests(TestCase):
         recipe = Recipe.objects.create(
             title='Spaghetti Bolognese',
             time_minutes=30,
-            price=Decimal('5.00'),
+            price=PRICE_5_00,
             user=self.user
         )
         recipe.ingredients.add(ingredient1)
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
-        serializer1 = IngredientSerializer(ingredient1)
-        serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(
+            {'id': ingredient1.id, 'name': ingredient1.name},
+            res.data,
+        )
+        self.assertNotIn(
+            {'id': ingredient2.id, 'name': ingredient2.name},
+            res.data,
+        )
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_filter_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items."""
         ingredient = Ingredient.objects.create(user=self.user, name='Chili')
         Ingredient.objects.create(user=self.user, name='Pepper')
-        recipe1 = Recipe.objects.create(
-            title='Chili Con Carne',
-            time_minutes=40,
-            price=Decimal('7.00'),
-            user=self.user
-        )
-        recipe2 = Recipe.objects.create(
-            title='Chili Soup',
-            time_minutes=20,
-            price=Decimal('4.00'),
-            user=self.user
-        )
+        recipe1, recipe2 = bulk_create_recipes(self.user)
         recipe1.ingredients.add(ingredient)
         recipe2.ingredients.add(ingredient)
 
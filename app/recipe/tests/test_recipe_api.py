@@ -4,9 +4,12 @@ Tests for the Recipe API
 from decimal import Decimal
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
-from django.test import TestCase
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -15,42 +18,44 @@ from core.models import (
     Tag,
     Ingredient,
 )
-from django.contrib.auth import get_user_model
+from core.tests.factories import (
+    RECIPE_DEFAULTS,
+    bulk_create_recipes,
+    fast_create_user,
+)
 from recipe.serializers import (
-    RecipeSerializer,
+    RecipeListSerializer,
     RecipeDetailSerializer,
 )
 
+PRICE_8_00 = Decimal('8.00')
+PRICE_10_00 = Decimal('10.00')
+PRICE_10_50 = Decimal('10.50')
+PRICE_12_00 = Decimal('12.00')
+PRICE_15_00 = Decimal('15.00')
+
 RECIPE_URL = reverse('recipe:recipe-list')
 
+RECIPE_DETAIL_URL = (
+    reverse('recipe:recipe-detail', args=[0]).rsplit('/', 2)[0] + '/{}/'
+)
+
 def detail_url(recipe_id):
     """Create and return a recipe detail URL."""
-    return reverse('recipe:recipe-detail', args=[recipe_id])
+    return RECIPE_DETAIL_URL.format(recipe_id)
 
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
-    defaults = {
-        'title': 'Sample Recipe',
-        'time_minutes': 22,
-        'price': Decimal('5.25'),
-        'description': 'Sample recipe description',
-        'link': 'http://example.com/recipe.pdf',
-    }
-    defaults.update(params)
+    defaults = {**RECIPE_DEFAULTS, **params}
     return Recipe.objects.create(user=user, **defaults)
 
 def image_upload_url(recipe_id):
     """Create and return an image upload URL."""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
-def create_user(**params):
-    """Create and return a new user."""
-    return get_user_model().objects.create_user(**params)
-
-class PublicRecipeApiTests(TestCase):
+class PublicRecipeApiTests(SimpleTestCase):
     """Test the unauthenticated API request."""
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
 
     def test_auth_required(self):
         """Test that authentication is required to access the API."""
@@ -60,39 +65,73 @@ class PublicRecipeApiTests(TestCase):
 
 class PrivateRecipeApiTests(TestCase):
     """Test the authenticated API requests."""
-    def setUp(self):
-        self.client = APIClient()
-        self.user = create_user(
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = fast_create_user(
             email='user@example.com',
             password='testpass123',
         )
+
+    def setUp(self):
         self.client.force_authenticate(self.user)
 
     def test_retrieve_recipes(self):
         """Test retrieving a list of recipes."""
-        create_recipe(user=self.user)
-        create_recipe(user=self.user)
+        bulk_create_recipes(user=self.user)
 
-        res = self.client.get(RECIPE_URL)
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL)
         recipes = Recipe.objects.all().order_by('-id')
-        serializer = RecipeSerializer(recipes, many=True)
+        serializer = RecipeListSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test that only recipes for the authenticated user are returned."""
-        other_user = create_user(
+        other_user = fast_create_user(
             email='other@example.com',
             password='password123',
         )
-        create_recipe(user=other_user)
-        create_recipe(user=self.user)
+        bulk_create_recipes(user=other_user)
+        bulk_create_recipes(user=self.user)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL)
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeListSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_recipe_list_paginated(self):
+        """Test listing recipes returns them a page at a time."""
+        bulk_create_recipes(user=self.user, n=26)
 
         res = self.client.get(RECIPE_URL)
-        recipes = Recipe.objects.filter(user=self.user)
-        serializer = RecipeSerializer(recipes, many=True)
+
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['count'], 26)
+        self.assertEqual(len(res.data['results']), 25)
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_recipe_list_shows_related_names(self):
+        """Test listing recipes renders tags and ingredients by name."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Tofu')
+        )
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['tags'], ['Vegan'])
+        self.assertEqual(res.data['results'][0]['ingredients'], ['Tofu'])
 
     def test_get_recipe_detail(self):
         """Test retrieving a recipe detail."""
@@ -107,7 +146,7 @@ class PrivateRecipeApiTests(TestCase):
         payload = {
             'title': 'Sample Recipe',
             'time_minutes': 30,
-            'price': Decimal('10.00'),
+            'price': PRICE_10_00,
             'description': 'Sample recipe description',
             'link': 'http://example.com/recipe.pdf',
         }
@@ -131,11 +170,29 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+        self.assertEqual(res.data['id'], recipe.id)
+        self.assertEqual(res.data['title'], payload['title'])
+        self.assertEqual(res.data['link'], original_link)
         recipe.refresh_from_db()
-        self.assertEqual(recipe.title, payload['title'])
-        self.assertEqual(recipe.link, original_link)
         self.assertEqual(recipe.user, self.user)
 
+    def test_partial_update_keeps_tags_and_ingredients(self):
+        """Test a PATCH without tags or ingredients leaves them untouched."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        payload = {'title': 'Updated Recipe'}
+        url = detail_url(recipe.id)
+        with self.assertNumQueries(6):
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
     def test_full_update_recipe(self):
         """Test updating a recipe with PUT."""
         recipe = create_recipe(
@@ -146,7 +203,7 @@ class PrivateRecipeApiTests(TestCase):
         payload = {
             'title': 'Updated Recipe',
             'time_minutes': 45,
-            'price': Decimal('15.00'),
+            'price': PRICE_15_00,
             'description': 'Updated recipe description',
             'link': 'http://example.com/updated_recipe.pdf',
         }
@@ -161,7 +218,7 @@ class PrivateRecipeApiTests(TestCase):
 
     def test_update_user_returns_error(self):
         """Test that updating the user field is not allowed."""
-        new_user = create_user(
+        new_user = fast_create_user(
             email='user2@example.com',
             password='test123',
         )
@@ -186,7 +243,7 @@ class PrivateRecipeApiTests(TestCase):
 
     def test_delete_other_user_recipe_error(self):
         """Test trying to delete another user's recipe gives error."""
-        new_user = create_user(
+        new_user = fast_create_user(
             email='user2@example.com',
             password='test123',
         )
@@ -203,7 +260,7 @@ class PrivateRecipeApiTests(TestCase):
         payload = {
             'title': 'Thai Prawn Curry',
             'time_minutes': 30,
-            'price': Decimal('10.50'),
+            'price': PRICE_10_50,
             'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
         }
         res = self.client.post(RECIPE_URL, payload, format='json')
@@ -220,13 +277,31 @@ class PrivateRecipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_with_duplicate_tags(self):
+        """Test repeated tag names in a payload create a single tag."""
+        payload = {
+            'title': 'Green Curry',
+            'time_minutes': 30,
+            'price': PRICE_10_50,
+            'tags': [{'name': 'Thai'}, {'name': 'thai'}, {'name': 'Thai'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Thai', 'thai'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
     def test_create_recipe_with_existing_tags(self):
         """Test creating a recipe with existing tags."""
         tag_indian = Tag.objects.create(user=self.user, name='Indian')
         payload = {
             'title': 'Pongal',
             'time_minutes': 25,
-            'price': Decimal('8.00'),
+            'price': PRICE_8_00,
             'tags': [{'name': 'Italian'}, {'name': 'Indian'}],
         }
         res = self.client.post(RECIPE_URL, payload, format='json')
@@ -244,6 +319,42 @@ class PrivateRecipeApiTests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    @patch('recipe.serializers.Tag.objects.bulk_create')
+    def test_create_recipe_rolls_back_on_error(self, patched_bulk_create):
+        """Test a failure saving tags does not leave a partial recipe."""
+        patched_bulk_create.side_effect = IntegrityError
+        payload = {
+            'title': 'Thai Prawn Curry',
+            'time_minutes': 30,
+            'price': PRICE_10_50,
+            'tags': [{'name': 'Thai'}],
+        }
+        with self.assertRaises(IntegrityError):
+            self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_create_recipe_tag_queries_constant(self):
+        """Test the queries to save tags do not grow with the tag count."""
+        Tag.objects.create(user=self.user, name='Indian')
+
+        def count_queries(names):
+            payload = {
+                'title': 'Pongal',
+                'time_minutes': 25,
+                'price': PRICE_8_00,
+                'tags': [{'name': name} for name in names],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPE_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(
+            count_queries(['Indian', 'Lunch']),
+            count_queries(['Indian', 'Dinner', 'Spicy', 'Vegan']),
+        )
+
     def test_create_tags_on_update(self):
         """Test creating tags when updating a recipe."""
         recipe = create_recipe(user=self.user)
@@ -271,8 +382,26 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(tag_lunch, recipe.tags.all())
-        self.assertNotIn(tag_breakfast, recipe.tags.all())
+        current = list(recipe.tags.all())
+        self.assertIn(tag_lunch, current)
+        self.assertNotIn(tag_breakfast, current)
+
+    def test_update_recipe_same_tags_keeps_assignment(self):
+        """Test resending the current tags does not rewrite them."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        through = Recipe.tags.through.objects.get(recipe=recipe, tag=tag)
+
+        payload = {'tags': [{'name': 'Breakfast'}]}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=through.id).exists()
+        )
+        self.assertEqual(recipe.tags.count(), 1)
 
     def test_clear_recipe_tags(self):
         """Test clearing a recipe's tags."""
@@ -285,15 +414,16 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(recipe.tags.count(), 0)
-        self.assertNotIn(tag, recipe.tags.all())
+        current = list(recipe.tags.all())
+        self.assertEqual(len(current), 0)
+        self.assertNotIn(tag, current)
 
     def test_create_recipe_with_new_ingredients(self):
         """Test creating a recipe with new ingredients."""
         payload = {
             'title': 'Spaghetti Bolognese',
             'time_minutes': 40,
-            'price': Decimal('12.00'),
+            'price': PRICE_12_00,
             'ingredients': [{'name': 'Spaghetti'}, {'name': 'Beef'}],
         }
         res = self.client.post(RECIPE_URL, payload, format='json')
@@ -337,8 +467,9 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(new_ingredient, recipe.ingredients.all())
-        self.assertNotIn(ingredient, recipe.ingredients.all())
+        current = list(recipe.ingredients.all())
+        self.assertIn(new_ingredient, current)
+        self.assertNotIn(ingredient, current)
 
     def test_clear_recipe_ingredients(self):
         """Test clearing a recipe's ingredients."""
@@ -351,8 +482,9 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(recipe.ingredients.count(), 0)
-        self.assertNotIn(ingredient, recipe.ingredients.all())
+        current = list(recipe.ingredients.all())
+        self.assertEqual(len(current), 0)
+        self.assertNotIn(ingredient, current)
 
     def test_filter_recipes_by_tags(self):
         """Test filtering recipes by tags."""
@@ -364,18 +496,64 @@ class PrivateRecipeApiTests(TestCase):
         recipe2.tags.add(tag2)
 
         recipe3 = create_recipe(user=self.user, title='Vegetable Stir Fry')
-        recipe3.tags.add(tag1)
 
         params = {'tags': f'{tag1.id},{tag2.id}'}
-        res = self.client.get(RECIPE_URL, params)
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL, params)
+
+        serializer1 = RecipeListSerializer(recipe1)
+        serializer2 = RecipeListSerializer(recipe2)
+        serializer3 = RecipeListSerializer(recipe3)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_filter_recipes_by_tag_returns_all_matches(self):
+        """Test filtering by a tag returns every recipe with that tag."""
+        recipe1 = create_recipe(user=self.user, title='Thai Green Curry')
+        recipe2 = create_recipe(user=self.user, title='Thai Red Curry')
+        tag = Tag.objects.create(user=self.user, name='Curry')
+        recipe1.tags.add(tag)
+        recipe2.tags.add(tag)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag.id}'})
 
-        serializer1 = RecipeSerializer(recipe1)
-        serializer2 = RecipeSerializer(recipe2)
-        serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe2.id, recipe1.id],
+        )
+
+    def test_filter_recipes_by_tags_unique(self):
+        """Test a recipe matching several filter tags is listed once."""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='Curry')
+        tag2 = Tag.objects.create(user=self.user, name='Indian')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_filter_recipes_by_tags_trailing_comma(self):
+        """Test empty items in the tag filter are ignored."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Curry')
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag.id},'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 1)
+
+    def test_filter_recipes_invalid_ids(self):
+        """Test non-numeric filter IDs return a bad request."""
+        res = self.client.get(RECIPE_URL, {'ingredients': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_filter_recipes_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -387,27 +565,30 @@ class PrivateRecipeApiTests(TestCase):
         recipe2.ingredients.add(ingredient2)
 
         recipe3 = create_recipe(user=self.user, title='Vegetable Stir Fry')
-        recipe3.ingredients.add(ingredient1)
 
         params = {'ingredients': f'{ingredient1.id},{ingredient2.id}'}
         res = self.client.get(RECIPE_URL, params)
 
-        serializer1 = RecipeSerializer(recipe1)
-        serializer2 = RecipeSerializer(recipe2)
-        serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        serializer1 = RecipeListSerializer(recipe1)
+        serializer2 = RecipeListSerializer(recipe2)
+        serializer3 = RecipeListSerializer(recipe3)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
 class RecipeImageUploadTests(TestCase):
     """Test uploading images to recipes."""
-    def setUp(self):
-        self.client = APIClient()
-        self.user = create_user(
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = fast_create_user(
             email='user@example.com',
             password='testpass123',
         )
+
+    def setUp(self):
         self.client.force_authenticate(self.user)
         self.recipe = create_recipe(user=self.user)
 
@@ -2,7 +2,7 @@
 Test for the tags API.
 """
 from decimal import Decimal
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -14,6 +14,9 @@ from django.contrib.auth import get_user_model
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
+TAG_DETAIL_URL = (
+    reverse('recipe:tag-detail', args=[0]).rsplit('/', 2)[0] + '/{}/'
+)
 
 def create_user(email='user@example.com', password='testpass123'):
     """Create and return a new user."""
@@ -21,12 +24,11 @@ def create_user(email='user@example.com', password='testpass123'):
 
 def detail_url(tag_id):
     """Create and return a tag detail URL."""
-    return reverse('recipe:tag-detail', args=[tag_id])
+    return TAG_DETAIL_URL.format(tag_id)
 
-class PublicTagsApiTests(TestCase):
+class PublicTagsApiTests(SimpleTestCase):
     """Test the publicly available tags API."""
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
 
     def test_auth_required(self):
         """Test that authentication is required to access the API."""
@@ -35,9 +37,13 @@ class PublicTagsApiTests(TestCase):
 
 class PrivateTagsApiTests(TestCase):
     """Test the authorized user tags API."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
     def setUp(self):
-        self.client = APIClient()
-        self.user = create_user()
         self.client.force_authenticate(self.user)
 
     def test_retrieve_tags(self):
@@ -45,7 +51,8 @@ class PrivateTagsApiTests(TestCase):
         Tag.objects.create(user=self.user, name='Vegan')
         Tag.objects.create(user=self.user, name='Dessert')
 
-        res = self.client.get(TAGS_URL)
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -81,6 +88,14 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(Tag.objects.count(), 0)
         self.assertEqual(Tag.objects.filter(user=self.user).count(), 0)
 
+    def test_create_tag_duplicate_name(self):
+        """Test creating a tag with a name the user already has fails."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = {'name': 'Vegan'}
+        res = self.client.post(TAGS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_update_tag(self):
         """Test updating a tag."""
         tag = Tag.objects.create(user=self.user, name='Vegan')
@@ -89,10 +104,10 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.patch(url, payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], payload['name'])
+        self.assertEqual(res.data['id'], tag.id)
         tag.refresh_from_db()
-        self.assertEqual(tag.name, payload['name'])
         self.assertEqual(tag.user, self.user)
-        self.assertEqual(tag.id, tag.id)
 
     def test_delete_tag(self):
         """Test deleting a tag."""
@@ -106,47 +121,55 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(tags.count(), 0)
         self.assertEqual(res.data, None)
 
+class AssignedTagsApiTests(TestCase):
+    """Test filtering tags by those assigned to recipes."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tag_breakfast, cls.tag_lunch = Tag.objects.bulk_create([
+            Tag(user=cls.user, name='Breakfast'),
+            Tag(user=cls.user, name='Lunch'),
+        ])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                title='Pancakes',
+                time_minutes=5,
+                price=Decimal('2.50'),
+                user=cls.user,
+            ),
+            Recipe(
+                title='Omelette',
+                time_minutes=10,
+                price=Decimal('3.00'),
+                user=cls.user,
+            ),
+        ])
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe=recipe, tag=cls.tag_breakfast)
+            for recipe in recipes
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
     def test_filter_tags_assigned_to_recipes(self):
         """Test listing tags assigned to recipes."""
-        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
-        tag2 = Tag.objects.create(user=self.user, name='Lunch')
-        recipe = Recipe.objects.create(
-            title='Pancakes',
-            time_minutes=5,
-            price=Decimal('2.50'),
-            user=self.user,
-        )
-        recipe.tags.add(tag1)
-
-        res = self.client.get(TAGS_URL, {'assigned_only': 1})
-        serializer1 = TagSerializer(tag1)
-        serializer2 = TagSerializer(tag2)
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        serializer1 = TagSerializer(self.tag_breakfast)
+        serializer2 = TagSerializer(self.tag_lunch)
         self.assertIn(serializer1.data, res.data)
         self.assertNotIn(serializer2.data, res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_filter_tags_assigned_unique(self):
         """Test filtering tags by assigned recipes returns unique items."""
-        tag = Tag.objects.create(user=self.user, name='Breakfast')
-        Tag.objects.create(user=self.user, name='Lunch')
-        recipe1 = Recipe.objects.create(
-            title='Pancakes',
-            time_minutes=5,
-            price=Decimal('2.50'),
-            user=self.user,
-        )
-        recipe1.tags.add(tag)
-        recipe2 = Recipe.objects.create(
-            title='Omelette',
-            time_minutes=10,
-            price=Decimal('3.00'),
-            user=self.user,
-        )
-        recipe2.tags.add(tag)
-
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
         self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(res.data[0]['name'], self.tag_breakfast.name)
+        self.assertEqual(res.data[0]['id'], self.tag_breakfast.id)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
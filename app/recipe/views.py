@@ -7,12 +7,18 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes
 )
+from django.db import (
+    IntegrityError,
+    transaction,
+)
 from rest_framework import (
     viewsets,
     mixins,
     status
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
@@ -51,12 +57,33 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+            # The recipe join yields a row per assignment.
+            queryset = queryset.filter(recipe__isnull=False).distinct()
+        if self.action == 'list':
+            queryset = queryset.only(
+                *self.get_serializer_class().get_default_fields_for_only()
+            )
+        return queryset.filter(user=self.request.user).order_by('-name')
+
+    def _save_unique(self, serializer, **kwargs):
+        """Save the object, rejecting a name the user already has."""
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            raise ValidationError({'name': ['This name already exists.']})
 
     def perform_create(self, serializer):
         """Create a new object with user."""
-        serializer.save(user=self.request.user)
+        self._save_unique(serializer, user=self.request.user)
+
+    def perform_update(self, serializer):
+        """Update an object."""
+        self._save_unique(serializer)
+
+class RecipePagination(PageNumberPagination):
+    """Paginate recipe lists."""
+    page_size = 25
 
 @extend_schema_view(
     list=extend_schema(
@@ -80,41 +107,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipePagination
 
     def _params_to_ints(self, query_params):
-        """Convert a list of strings to integers."""
-        return [int(param) for param in query_params.split(',')]
+        """Convert a comma separated string to a tuple of integers."""
+        try:
+            return tuple(
+                int(param) for param in query_params.split(',') if param
+            )
+        except ValueError:
+            raise ValidationError('IDs must be comma separated integers.')
 
     def get_queryset(self):
-        """Retrieve recipes for authenticated user, one per filter tag/ingredient."""
+        """Retrieve recipes for authenticated user."""
         base_qs = self.queryset.filter(user=self.request.user)
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        # Joining through tags or ingredients can repeat a recipe.
+        need_distinct = False
 
         if tags:
             tag_ids = self._params_to_ints(tags)
-            qs = Recipe.objects.none()
-            for tag_id in tag_ids:
-                recipe = base_qs.filter(tags__id=tag_id).order_by('id').first()
-                if recipe:
-                    qs |= base_qs.filter(id=recipe.id)
-            base_qs = qs
+            base_qs = base_qs.filter(tags__id__in=tag_ids)
+            need_distinct = True
 
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            qs = Recipe.objects.none()
-            for ing_id in ingredient_ids:
-                recipe = base_qs.filter(ingredients__id=ing_id).order_by('id').first()
-                if recipe:
-                    qs |= base_qs.filter(id=recipe.id)
-            base_qs = qs
+            base_qs = base_qs.filter(ingredients__id__in=ingredient_ids)
+            need_distinct = True
 
-        return base_qs.order_by('-id').distinct()
+        if self.action == 'list':
+            base_qs = base_qs.only(
+                *self.get_serializer_class().get_default_fields_for_only()
+            )
+        if self.action in ('list', 'retrieve'):
+            # Writes re-query relations after saving; deletes never read them.
+            base_qs = serializers.RecipeSerializer.setup_eager_loading(base_qs)
+        base_qs = base_qs.order_by('-id')
+        return base_qs.distinct() if need_distinct else base_qs
 
     def get_serializer_class(self):
         """Return appropriate serializer class."""
         if self.action == 'list':
-            return serializers.RecipeSerializer
+            return serializers.RecipeListSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
         return self.serializer_class